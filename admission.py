@@ -0,0 +1,154 @@
+# admission.py
+from collections import deque
+from contextlib import asynccontextmanager
+from fastapi import HTTPException, Request
+import asyncio, heapq, itertools, math, os, time
+
+AI_MAX_CONCURRENCY = int(os.getenv("AI_MAX_CONCURRENCY", "4"))
+AI_MAX_QUEUE = int(os.getenv("AI_MAX_QUEUE", "32"))
+AI_DEFAULT_DEADLINE_SECONDS = float(os.getenv("AI_DEFAULT_DEADLINE_SECONDS", "60"))
+AI_INITIAL_SERVICE_SECONDS = float(os.getenv("AI_INITIAL_SERVICE_SECONDS", "20"))
+
+# Lower number is served first
+PRIORITY_CLASSES = {"high": 0, "normal": 1, "low": 2}
+
+# "client-id:class,client-id:class", e.g. "advisor-app:high,nightly-batch:low"
+CALLER_PRIORITIES = dict(
+    item.strip().split(":", 1)
+    for item in os.getenv("AI_CALLER_PRIORITIES", "").split(",")
+    if ":" in item
+)
+
+
+class AdmissionController:
+    """
+    Bounded, priority-ordered admission for a slow backend.
+
+    Requests beyond max_concurrency wait in a queue of at most max_queue entries.
+    A request is rejected up front with 503 + Retry-After when the queue is full or
+    when its estimated completion time (queue wait + one service time) would
+    exceed the caller's deadline.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int, initial_service_seconds: float):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.avg_service_seconds = initial_service_seconds
+        self.in_flight = 0
+        self._waiters = []  # heap of (priority, seq, future)
+        self._seq = itertools.count()
+        self._wait_times = deque(maxlen=1000)
+        self.counters = {"admitted": 0, "completed": 0, "rejected_queue_full": 0, "rejected_deadline": 0, "timed_out_in_queue": 0}
+
+    # ---------------- Estimates ----------------
+    def estimated_wait(self, priority: int) -> float:
+        if self.in_flight < self.max_concurrency and not self._waiters:
+            return 0.0
+        ahead = sum(1 for p, _, _ in self._waiters if p <= priority)
+        return (ahead // self.max_concurrency + 1) * self.avg_service_seconds
+
+    def _reject(self, reason: str, retry_after: float, detail: str):
+        self.counters[reason] += 1
+        raise HTTPException(
+            status_code=503,
+            detail=detail,
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+    # ---------------- Slots ----------------
+    def _release(self):
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)  # hand the slot straight to the next waiter
+                return
+        self.in_flight -= 1
+
+    def _abandon(self, entry):
+        """Leave the queue; a slot that was granted just as we gave up is passed on."""
+        if entry in self._waiters:
+            self._waiters.remove(entry)
+            heapq.heapify(self._waiters)
+        future = entry[2]
+        if future.done():
+            self._release()
+        else:
+            future.cancel()
+
+    @asynccontextmanager
+    async def slot(self, priority: int = PRIORITY_CLASSES["normal"], deadline: float = AI_DEFAULT_DEADLINE_SECONDS):
+        queued_at = time.monotonic()
+        if self.in_flight < self.max_concurrency and not self._waiters:
+            self.in_flight += 1
+        else:
+            if len(self._waiters) >= self.max_queue:
+                self._reject("rejected_queue_full", self.estimated_wait(priority), "AI analysis queue is full, try again later")
+            wait = self.estimated_wait(priority)
+            if wait + self.avg_service_seconds > deadline:
+                self._reject("rejected_deadline", wait, "AI analysis cannot complete before the request deadline")
+
+            future = asyncio.get_running_loop().create_future()
+            entry = (priority, next(self._seq), future)
+            heapq.heappush(self._waiters, entry)
+            # asyncio.wait rather than wait_for: on 3.11 wait_for drops a cancellation that lands
+            # together with the grant, and the cancelled request would then take the slot
+            try:
+                await asyncio.wait([future], timeout=deadline - self.avg_service_seconds)
+            except BaseException:
+                self._abandon(entry)
+                raise
+            if not future.done():
+                self._abandon(entry)
+                self._reject("timed_out_in_queue", self.estimated_wait(priority), "AI analysis timed out waiting in queue")
+
+        self.counters["admitted"] += 1
+        self._wait_times.append(time.monotonic() - queued_at)
+        started_at = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - started_at
+            self.avg_service_seconds = 0.8 * self.avg_service_seconds + 0.2 * elapsed
+            self.counters["completed"] += 1
+            self._release()
+
+    # ---------------- Metrics ----------------
+    def metrics(self) -> dict:
+        waits = sorted(self._wait_times)
+        depth_by_class = {name: 0 for name in PRIORITY_CLASSES}
+        class_names = {v: k for k, v in PRIORITY_CLASSES.items()}
+        for p, _, future in self._waiters:
+            if not future.done():
+                depth_by_class[class_names.get(p, str(p))] += 1
+        return {
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "queue_depth": sum(depth_by_class.values()),
+            "queue_depth_by_class": depth_by_class,
+            "max_queue": self.max_queue,
+            "avg_service_seconds": round(self.avg_service_seconds, 3),
+            "wait_seconds": {
+                "avg": round(sum(waits) / len(waits), 3) if waits else 0.0,
+                "p50": round(waits[len(waits) // 2], 3) if waits else 0.0,
+                "p95": round(waits[int(len(waits) * 0.95)], 3) if waits else 0.0,
+                "max": round(waits[-1], 3) if waits else 0.0,
+            },
+            **self.counters,
+        }
+
+
+ai_admission = AdmissionController(AI_MAX_CONCURRENCY, AI_MAX_QUEUE, AI_INITIAL_SERVICE_SECONDS)
+
+
+def request_priority(request: Request) -> int:
+    """Priority class comes from the caller's X-Client-Id via AI_CALLER_PRIORITIES."""
+    class_name = CALLER_PRIORITIES.get(request.headers.get("X-Client-Id", ""), "normal")
+    return PRIORITY_CLASSES.get(class_name, PRIORITY_CLASSES["normal"])
+
+
+def request_deadline(request: Request) -> float:
+    """Client deadline in seconds from X-Request-Timeout, defaulting to AI_DEFAULT_DEADLINE_SECONDS."""
+    try:
+        return float(request.headers["X-Request-Timeout"])
+    except (KeyError, ValueError):
+        return AI_DEFAULT_DEADLINE_SECONDS
@@ -1,8 +1,10 @@
 # crud.py
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from models import User, Portfolio, Holding, TickerMetadata
+from models import User, Portfolio, Holding, TickerMetadata, TickerQuote, PortfolioAIInsights, PortfolioValuation, PortfolioValuationRollup
+from datetime import datetime
 from schemas import UserCreate, PortfolioCreate, HoldingCreate, TickerMetadataCreate
-import httpx, asyncio, os
+import prefetcher, ticker_search, os
 
 FINNHUB_API_KEY = os.getenv("FINNHUB_API_KEY")  # set in environment
 # ---------------- User ----------------
@@ -42,6 +44,9 @@ def get_portfolio(db: Session, portfolio_id: int):
 def get_user_portfolios(db: Session, user_id: int):
     return db.query(Portfolio).filter(Portfolio.user_id == user_id).all()
 
+def get_all_portfolios(db: Session):
+    return db.query(Portfolio).all()
+
 # ---------------- Holdings ----------------
 def add_holding(db: Session, holding: HoldingCreate, portfolio_id: int):
     db_holding = Holding(
@@ -65,6 +70,20 @@ def add_multiple_holdings(db: Session, holdings_list: list[HoldingCreate], portf
 def get_portfolio_holdings(db: Session, portfolio_id: int):
     return db.query(Holding).filter(Holding.portfolio_id == portfolio_id).all()
 
+def get_all_holdings(db: Session):
+    return db.query(Holding).all()
+
+def get_held_tickers_by_popularity(db: Session):
+    # Distinct held tickers, most widely held (number of portfolios) first
+    holders = func.count(func.distinct(Holding.portfolio_id))
+    rows = (
+        db.query(Holding.ticker)
+        .group_by(Holding.ticker)
+        .order_by(holders.desc(), Holding.ticker)
+        .all()
+    )
+    return [row.ticker for row in rows]
+
 # ---------------- Ticker Metadata ----------------
 def upsert_ticker_metadata(db: Session, ticker_data: TickerMetadataCreate):
     db_ticker = db.query(TickerMetadata).filter(TickerMetadata.ticker == ticker_data.ticker).first()
@@ -72,6 +91,7 @@ def upsert_ticker_metadata(db: Session, ticker_data: TickerMetadataCreate):
         db_ticker.sector = ticker_data.sector
         db_ticker.country = ticker_data.country
         db_ticker.industry = ticker_data.industry
+        db_ticker.last_updated = func.now()
     else:
         db_ticker = TickerMetadata(
             ticker=ticker_data.ticker,
@@ -82,11 +102,75 @@ def upsert_ticker_metadata(db: Session, ticker_data: TickerMetadataCreate):
         db.add(db_ticker)
     db.commit()
     db.refresh(db_ticker)
+    ticker_search.index.upsert(db_ticker)
     return db_ticker
 
 def get_ticker_metadata(db: Session, ticker: str):
     return db.query(TickerMetadata).filter(TickerMetadata.ticker == ticker).first()
 
+def get_all_ticker_metadata(db: Session):
+    return db.query(TickerMetadata).all()
+
+def get_ticker_metadata_bulk(db: Session, tickers: list[str]):
+    if not tickers:
+        return []
+    return db.query(TickerMetadata).filter(TickerMetadata.ticker.in_(tickers)).all()
+
+# ---------------- Ticker Quotes ----------------
+def upsert_ticker_quotes(db: Session, prices: dict[str, float], fetched_at: datetime):
+    existing = {q.ticker: q for q in get_ticker_quotes_bulk(db, list(prices))}
+    for ticker, price in prices.items():
+        db_quote = existing.get(ticker)
+        if db_quote:
+            db_quote.price = price
+            db_quote.fetched_at = fetched_at
+        else:
+            db.add(TickerQuote(ticker=ticker, price=price, fetched_at=fetched_at))
+    db.commit()
+
+def get_ticker_quotes_bulk(db: Session, tickers: list[str]):
+    if not tickers:
+        return []
+    return db.query(TickerQuote).filter(TickerQuote.ticker.in_(tickers)).all()
+
+# ---------------- AI Insights ----------------
+def save_portfolio_ai_insights(db: Session, portfolio_id: int, insights: str):
+    db_insights = PortfolioAIInsights(portfolio_id=portfolio_id, insights=insights)
+    db.add(db_insights)
+    db.commit()
+    db.refresh(db_insights)
+    return db_insights
+
+def get_latest_portfolio_ai_insights(db: Session, portfolio_id: int):
+    return (
+        db.query(PortfolioAIInsights)
+        .filter(PortfolioAIInsights.portfolio_id == portfolio_id)
+        .order_by(PortfolioAIInsights.id.desc())
+        .first()
+    )
+
+# ---------------- Valuation History ----------------
+def get_valuation_history(db: Session, portfolio_id: int, resolution: str = "raw",
+                          start: datetime | None = None, end: datetime | None = None, limit: int = 1000):
+    """
+    Newest `limit` points in [start, end), oldest first, plus whether older points in the
+    range were left out. Index range scan on (portfolio_id, time): cost scales with the
+    points returned.
+    """
+    if resolution == "raw":
+        model, ts = PortfolioValuation, PortfolioValuation.captured_at
+        query = db.query(model).filter(model.portfolio_id == portfolio_id)
+    else:
+        model, ts = PortfolioValuationRollup, PortfolioValuationRollup.bucket_start
+        query = db.query(model).filter(model.portfolio_id == portfolio_id, model.resolution == resolution)
+    if start:
+        query = query.filter(ts >= start)
+    if end:
+        query = query.filter(ts < end)
+    rows = query.order_by(ts.desc()).limit(limit + 1).all()
+    truncated = len(rows) > limit
+    return rows[:limit][::-1], truncated
+
 
 async def analyze_saved_portfolio(db: Session, portfolio_id: int) -> dict:
     portfolio = get_portfolio(db, portfolio_id)
@@ -100,23 +184,11 @@ async def analyze_saved_portfolio(db: Session, portfolio_id: int) -> dict:
     sector_distribution = {}
     country_exposure = {}
 
-    # Fetch quotes & profiles asynchronously
-    async with httpx.AsyncClient() as client:
-        tasks = [
-            client.get(f"https://finnhub.io/api/v1/quote?symbol={h.ticker}&token={FINNHUB_API_KEY}")
-            for h in holdings
-        ] + [
-            client.get(f"https://finnhub.io/api/v1/stock/profile2?symbol={h.ticker}&token={FINNHUB_API_KEY}")
-            for h in holdings
-        ]
-        responses = await asyncio.gather(*tasks)
-
-    num_holdings = len(holdings)
-    quotes = [r.json() for r in responses[:num_holdings]]
-    profiles = [r.json() for r in responses[num_holdings:]]
-
-    for i, h in enumerate(holdings):
-        quote_data, profile_data = quotes[i], profiles[i]
+    # Quotes & profiles come from the prefetched cache; only misses hit Finnhub
+    quotes, profiles = await prefetcher.load_market_data(db, [h.ticker for h in holdings])
+
+    for h in holdings:
+        quote_data, profile_data = quotes.get(h.ticker, {}), profiles.get(h.ticker, {})
         if "c" not in quote_data or not profile_data:
             continue  # skip invalid tickers
 
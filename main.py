@@ -1,15 +1,56 @@
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
-import os
+from contextlib import asynccontextmanager
+import os, asyncio
 
-from routers import users, portfolios, holdings, ticker_metadata, analyze_portfolio_ai
+from routers import users, portfolios, holdings, ticker_metadata, analyze_portfolio_ai, scenarios
+import prefetcher, valuation_history, ticker_search, database, models
 
+LEADER_RETRY_SECONDS = int(os.getenv("LEADER_RETRY_SECONDS", "30"))
+
+
+async def run_as_leader(*jobs):
+    """Run jobs in exactly one worker process; the others keep retrying in case the leader goes away."""
+    while True:
+        try:
+            leader_conn = await asyncio.to_thread(database.acquire_leader_lock)
+        except Exception as e:
+            print("⚠️ background leader lock failed:", e)
+            leader_conn = None
+        if leader_conn is not None:
+            break
+        await asyncio.sleep(LEADER_RETRY_SECONDS)
+    try:
+        await asyncio.gather(*(job() for job in jobs))
+    finally:
+        leader_conn.close()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create any missing tables (ticker_quotes, portfolio_valuations, ...); existing tables are left as-is
+    await asyncio.to_thread(models.Base.metadata.create_all, bind=database.engine)
+    # Ticker autocomplete is served from memory; built once here, then kept current by upserts
+    try:
+        await asyncio.to_thread(ticker_search.rebuild_index)
+    except Exception as e:
+        print("⚠️ ticker index build failed:", e)
+    index_task = asyncio.create_task(ticker_search.run_index_refresh())
+    # One worker keeps quotes & profiles warm and takes the valuation snapshots
+    # that feed /portfolios/{id}/history
+    leader_task = asyncio.create_task(
+        run_as_leader(prefetcher.run_prefetcher, valuation_history.run_valuation_snapshots)
+    )
+    yield
+    leader_task.cancel()
+    index_task.cancel()
 
 
 app = FastAPI(
     title="Portfolio Analyzer API",
     description="Analyze stock portfolio using Finnhub data",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 FINNHUB_API_KEY = os.getenv("FINNHUB_API_KEY")  # set in environment
@@ -23,6 +64,7 @@ app.include_router(holdings.router)
 app.include_router(ticker_metadata.router)
 
 app.include_router(analyze_portfolio_ai.router)
+app.include_router(scenarios.router)
 
 
 
@@ -33,3 +75,4 @@ print("Portfolios router:", portfolios)
 print("Holdings router:", holdings)
 print("Ticker Metadata router:", ticker_metadata)
 print("AI Analysis router:", analyze_portfolio_ai)
+print("Scenarios router:", scenarios)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, func
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Index, UniqueConstraint, func
 from sqlalchemy.orm import relationship
 from database import Base   
 
@@ -55,9 +55,56 @@ class TickerMetadata(Base):
     last_updated = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
 
+# ---------------- Ticker Quotes ----------------
+# Latest prefetched quote per ticker, shared by every worker process
+class TickerQuote(Base):
+    __tablename__ = "ticker_quotes"
+
+    id = Column(Integer, primary_key=True, index=True)
+    ticker = Column(String, unique=True, nullable=False, index=True)
+    price = Column(Float, nullable=False)
+    fetched_at = Column(DateTime(timezone=True), nullable=False)
+
+
 class PortfolioAIInsights(Base):
     __tablename__ = "portfolio_ai_insights"
 
     id = Column(Integer, primary_key=True, index=True)
     portfolio_id = Column(Integer, ForeignKey("portfolios.id"))
     insights = Column(String)
+
+
+# ---------------- Portfolio Valuation History ----------------
+# Append-only: one row per scheduled snapshot, never updated
+class PortfolioValuation(Base):
+    __tablename__ = "portfolio_valuations"
+    __table_args__ = (
+        Index("ix_portfolio_valuations_portfolio_captured", "portfolio_id", "captured_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    portfolio_id = Column(Integer, ForeignKey("portfolios.id"), nullable=False)
+    captured_at = Column(DateTime(timezone=True), nullable=False)
+    total_value = Column(Float, nullable=False)
+    cash = Column(Float, nullable=False)
+    sector_weights = Column(String)  # JSON: {sector: percent}
+
+
+# Downsampled OHLC buckets (day / week / month), maintained as snapshots are appended
+class PortfolioValuationRollup(Base):
+    __tablename__ = "portfolio_valuation_rollups"
+    __table_args__ = (
+        UniqueConstraint("portfolio_id", "resolution", "bucket_start", name="uq_portfolio_valuation_rollup"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    portfolio_id = Column(Integer, ForeignKey("portfolios.id"), nullable=False)
+    resolution = Column(String, nullable=False)
+    bucket_start = Column(DateTime(timezone=True), nullable=False)
+    open_value = Column(Float, nullable=False)
+    high_value = Column(Float, nullable=False)
+    low_value = Column(Float, nullable=False)
+    close_value = Column(Float, nullable=False)
+    cash = Column(Float, nullable=False)
+    sector_weights = Column(String)
+    samples = Column(Integer, nullable=False, default=1)
@@ -0,0 +1,241 @@
+# prefetcher.py
+from datetime import datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from schemas import TickerMetadataCreate
+import crud, httpx, asyncio, os
+
+FINNHUB_API_KEY = os.getenv("FINNHUB_API_KEY")  # set in environment
+
+PREFETCH_INTERVAL_SECONDS = int(os.getenv("PREFETCH_INTERVAL_SECONDS", "60"))
+PREFETCH_BATCH_SIZE = int(os.getenv("PREFETCH_BATCH_SIZE", "20"))
+FINNHUB_CALLS_PER_MINUTE = int(os.getenv("FINNHUB_CALLS_PER_MINUTE", "60"))
+QUOTE_MAX_AGE_SECONDS = int(os.getenv("QUOTE_MAX_AGE_SECONDS", "900"))
+PROFILE_MAX_AGE_HOURS = int(os.getenv("PROFILE_MAX_AGE_HOURS", "168"))
+# Minutes after the close before the official closing price is fetched
+CLOSE_SETTLE_MINUTES = int(os.getenv("CLOSE_SETTLE_MINUTES", "15"))
+
+# Set once the first refresh cycle has written quotes; consumers of the cache can wait on it
+first_cycle_done = asyncio.Event()
+
+# Exchange suffix -> (timezone, open, close). Anything without a known suffix is treated as US.
+MARKET_HOURS = {
+    "": ("America/New_York", time(9, 30), time(16, 0)),
+    ".TO": ("America/Toronto", time(9, 30), time(16, 0)),
+    ".L": ("Europe/London", time(8, 0), time(16, 30)),
+    ".NS": ("Asia/Kolkata", time(9, 15), time(15, 30)),
+    ".BO": ("Asia/Kolkata", time(9, 15), time(15, 30)),
+}
+
+
+def _as_utc(ts: datetime) -> datetime:
+    return ts.replace(tzinfo=timezone.utc) if ts.tzinfo is None else ts
+
+
+# ---------------- Market Hours ----------------
+def _market_hours(ticker: str):
+    suffix = "." + ticker.rsplit(".", 1)[1] if "." in ticker else ""
+    return MARKET_HOURS.get(suffix, MARKET_HOURS[""])
+
+
+def market_is_open(ticker: str, now: datetime | None = None) -> bool:
+    """Rough session check (weekdays, regular hours, no holiday calendar)."""
+    tz_name, open_at, close_at = _market_hours(ticker)
+    local_now = (now or datetime.now(timezone.utc)).astimezone(ZoneInfo(tz_name))
+    if local_now.weekday() >= 5:
+        return False
+    return open_at <= local_now.time() <= close_at
+
+
+def last_settled_close(ticker: str, now: datetime | None = None) -> datetime:
+    """Most recent weekday close (plus CLOSE_SETTLE_MINUTES) at or before now."""
+    tz_name, _, close_at = _market_hours(ticker)
+    local_now = (now or datetime.now(timezone.utc)).astimezone(ZoneInfo(tz_name))
+    day = local_now.date()
+    while True:
+        if day.weekday() < 5:
+            settled = datetime.combine(day, close_at, tzinfo=ZoneInfo(tz_name)) + timedelta(minutes=CLOSE_SETTLE_MINUTES)
+            if settled <= local_now:
+                return settled
+        day -= timedelta(days=1)
+
+
+def quote_needs_refresh(ticker: str, fetched_at: datetime | None, now: datetime | None = None) -> bool:
+    # While closed, fetch once after the close so the official closing price replaces the last intraday one
+    if fetched_at is None or market_is_open(ticker, now):
+        return True
+    return _as_utc(fetched_at) < last_settled_close(ticker, now)
+
+
+def quote_is_usable(ticker: str, fetched_at: datetime) -> bool:
+    """Whether a stored quote is fresh enough for interactive analysis."""
+    age = datetime.now(timezone.utc) - _as_utc(fetched_at)
+    return age <= timedelta(seconds=QUOTE_MAX_AGE_SECONDS) or not market_is_open(ticker)
+
+
+# ---------------- Finnhub Payloads ----------------
+def _valid_quote(quote_data: dict) -> bool:
+    return bool(quote_data.get("c"))  # Finnhub answers unknown symbols with c=0
+
+
+def _valid_profile(profile_data: dict) -> bool:
+    return bool(profile_data.get("finnhubIndustry") or profile_data.get("name"))
+
+
+def _profile_is_stale(db_ticker) -> bool:
+    if db_ticker is None or db_ticker.last_updated is None:
+        return True
+    return datetime.now(timezone.utc) - _as_utc(db_ticker.last_updated) > timedelta(hours=PROFILE_MAX_AGE_HOURS)
+
+
+def _store_quotes(db: Session, quotes: dict[str, dict]):
+    prices = {ticker: q["c"] for ticker, q in quotes.items() if _valid_quote(q)}
+    if prices:
+        crud.upsert_ticker_quotes(db, prices, datetime.now(timezone.utc))
+
+
+def _store_profile(db: Session, ticker: str, profile_data: dict):
+    if not _valid_profile(profile_data):
+        return None
+    industry = profile_data.get("finnhubIndustry", "Unknown")
+    return crud.upsert_ticker_metadata(db, TickerMetadataCreate(
+        ticker=ticker,
+        sector=industry,
+        country=profile_data.get("country", "Unknown"),
+        industry=industry,
+    ))
+
+
+# ---------------- Finnhub Fetching ----------------
+def _quote_url(ticker: str) -> str:
+    return f"https://finnhub.io/api/v1/quote?symbol={ticker}&token={FINNHUB_API_KEY}"
+
+
+def _profile_url(ticker: str) -> str:
+    return f"https://finnhub.io/api/v1/stock/profile2?symbol={ticker}&token={FINNHUB_API_KEY}"
+
+
+async def _fetch_json(client: httpx.AsyncClient, url: str) -> dict:
+    """Payload of a successful call; errors (429s, {"error": ...} bodies, bad JSON) come back as {}."""
+    try:
+        resp = await client.get(url)
+        if resp.status_code != 200:
+            return {}
+        data = resp.json()
+    except (httpx.HTTPError, ValueError):
+        return {}
+    if not isinstance(data, dict) or "error" in data:
+        return {}
+    return data
+
+
+async def _fetch_in_batches(client: httpx.AsyncClient, urls: list[str]) -> list[dict]:
+    """Fetch urls in batches, pausing between batches to stay under the Finnhub rate limit."""
+    results = []
+    pause = PREFETCH_BATCH_SIZE * 60 / FINNHUB_CALLS_PER_MINUTE
+    for start in range(0, len(urls), PREFETCH_BATCH_SIZE):
+        if start:
+            await asyncio.sleep(pause)
+        batch = urls[start:start + PREFETCH_BATCH_SIZE]
+        results += await asyncio.gather(*[_fetch_json(client, url) for url in batch])
+    return results
+
+
+# ---------------- Background Refresh ----------------
+# DB work runs in worker threads so a cold start with many tickers doesn't stall the event loop
+def _plan_refresh() -> tuple[list[str], list[str]]:
+    db = SessionLocal()
+    try:
+        # Most widely held first, so a slow cycle still covers the tickers that matter most
+        tickers = crud.get_held_tickers_by_popularity(db)
+        fetched_at = {q.ticker: q.fetched_at for q in crud.get_ticker_quotes_bulk(db, tickers)}
+        metadata = {m.ticker: m for m in crud.get_ticker_metadata_bulk(db, tickers)}
+    finally:
+        db.close()
+    now = datetime.now(timezone.utc)
+    quote_tickers = [t for t in tickers if quote_needs_refresh(t, fetched_at.get(t), now)]
+    profile_tickers = [t for t in tickers if _profile_is_stale(metadata.get(t))]
+    return quote_tickers, profile_tickers
+
+
+def _save_refresh(quotes: dict[str, dict], profiles: dict[str, dict]):
+    db = SessionLocal()
+    try:
+        _store_quotes(db, quotes)
+        for ticker, profile_data in profiles.items():
+            _store_profile(db, ticker, profile_data)
+    finally:
+        db.close()
+
+
+async def prefetch_once():
+    quote_tickers, profile_tickers = await asyncio.to_thread(_plan_refresh)
+    async with httpx.AsyncClient() as client:
+        # One paced stream for quotes and profiles together, so the rate limit holds across both
+        responses = await _fetch_in_batches(
+            client, [_quote_url(t) for t in quote_tickers] + [_profile_url(t) for t in profile_tickers]
+        )
+    quotes = dict(zip(quote_tickers, responses[:len(quote_tickers)]))
+    profiles = dict(zip(profile_tickers, responses[len(quote_tickers):]))
+    await asyncio.to_thread(_save_refresh, quotes, profiles)
+
+
+async def run_prefetcher():
+    """Background loop; run by the background-job leader only (see main.lifespan)."""
+    while True:
+        try:
+            await prefetch_once()
+            first_cycle_done.set()
+        except Exception as e:
+            print("⚠️ price prefetch failed:", e)
+        await asyncio.sleep(PREFETCH_INTERVAL_SECONDS)
+
+
+# ---------------- Analysis Path ----------------
+def cached_market_data(db: Session, tickers: list[str]) -> tuple[dict, dict]:
+    """Last known quote and stored profile per ticker, whatever their age. Never calls Finnhub."""
+    quotes = {q.ticker: {"c": q.price} for q in crud.get_ticker_quotes_bulk(db, tickers)}
+    profiles = {
+        m.ticker: {"finnhubIndustry": m.sector or "Unknown", "country": m.country or "Unknown"}
+        for m in crud.get_ticker_metadata_bulk(db, tickers)
+    }
+    return quotes, profiles
+
+
+async def load_market_data(db: Session, tickers: list[str]) -> tuple[dict, dict]:
+    """
+    Return (quotes, profiles) keyed by ticker in the same shape Finnhub returns
+    ({"c": price} / {"finnhubIndustry": ..., "country": ...}). Served from the
+    prefetched ticker_quotes and TickerMetadata; only misses go to Finnhub.
+    Tickers Finnhub can't price or profile are left out.
+    """
+    tickers = list(dict.fromkeys(tickers))
+    quotes, profiles = {}, {}
+
+    for q in crud.get_ticker_quotes_bulk(db, tickers):
+        if quote_is_usable(q.ticker, q.fetched_at):
+            quotes[q.ticker] = {"c": q.price}
+    for m in crud.get_ticker_metadata_bulk(db, tickers):
+        profiles[m.ticker] = {"finnhubIndustry": m.sector or "Unknown", "country": m.country or "Unknown"}
+
+    missing_quotes = [t for t in tickers if t not in quotes]
+    missing_profiles = [t for t in tickers if t not in profiles]
+    if not missing_quotes and not missing_profiles:
+        return quotes, profiles
+
+    async with httpx.AsyncClient() as client:
+        responses = await asyncio.gather(*[
+            _fetch_json(client, _quote_url(t)) for t in missing_quotes
+        ] + [
+            _fetch_json(client, _profile_url(t)) for t in missing_profiles
+        ])
+
+    fetched_quotes = dict(zip(missing_quotes, responses[:len(missing_quotes)]))
+    _store_quotes(db, fetched_quotes)
+    quotes.update({t: q for t, q in fetched_quotes.items() if _valid_quote(q)})
+    for ticker, profile_data in zip(missing_profiles, responses[len(missing_quotes):]):
+        if _store_profile(db, ticker, profile_data):
+            profiles[ticker] = profile_data
+
+    return quotes, profiles
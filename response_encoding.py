@@ -0,0 +1,112 @@
+# response_encoding.py
+from datetime import date, datetime
+from fastapi import Request, Response
+import json
+
+try:
+    import orjson
+except ImportError:  # stdlib fallback
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # MessagePack is simply not offered
+    msgpack = None
+
+MEDIA_JSON = "application/json"
+MEDIA_COLUMNAR_JSON = "application/vnd.portfolio.columnar+json"
+MEDIA_MSGPACK = "application/msgpack"
+MEDIA_COLUMNAR_MSGPACK = "application/vnd.portfolio.columnar+msgpack"
+
+MEDIA_ALIASES = {"application/x-msgpack": MEDIA_MSGPACK}
+
+
+def supported_media_types() -> list[str]:
+    types = [MEDIA_JSON, MEDIA_COLUMNAR_JSON]
+    if msgpack:
+        types += [MEDIA_MSGPACK, MEDIA_COLUMNAR_MSGPACK]
+    return types
+
+
+# ---------------- Negotiation ----------------
+def negotiate(request: Request) -> str:
+    """Pick the highest-q supported type from the Accept header; JSON when nothing matches."""
+    supported = supported_media_types()
+    best, best_q = MEDIA_JSON, 0.0
+    for position, part in enumerate(request.headers.get("accept", "").split(",")):
+        media, *params = [p.strip() for p in part.split(";")]
+        media = MEDIA_ALIASES.get(media.lower(), media.lower())
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        if media in supported and q > best_q:
+            best, best_q = media, q
+    return best
+
+
+# ---------------- Layouts ----------------
+class Rows(list):
+    """A list of row dicts that knows its fields, so an empty one still goes columnar as {field: []}."""
+
+    def __init__(self, rows, fields: list[str]):
+        super().__init__(rows)
+        self.fields = list(fields)
+
+
+def rows_from_orm(objs, fields: list[str]) -> Rows:
+    """Plain dicts straight from ORM attributes, skipping per-row Pydantic validation."""
+    return Rows(({field: getattr(obj, field) for field in fields} for obj in objs), fields)
+
+
+def to_columnar(payload):
+    """Turn every list of dicts into {field: [values...]}, recursively."""
+    if isinstance(payload, Rows) and not payload:
+        return {field: [] for field in payload.fields}
+    if isinstance(payload, list) and payload and all(isinstance(row, dict) for row in payload):
+        fields = list(dict.fromkeys(key for row in payload for key in row))
+        return {field: [to_columnar(row.get(field)) for row in payload] for field in fields}
+    if isinstance(payload, dict):
+        return {key: to_columnar(value) for key, value in payload.items()}
+    if isinstance(payload, list):
+        return [to_columnar(value) for value in payload]
+    return payload
+
+
+# ---------------- Encoders ----------------
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Cannot encode {type(value).__name__}")
+
+
+def _dump_json(payload) -> bytes:
+    if orjson:
+        return orjson.dumps(payload, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, default=_default, separators=(",", ":")).encode()
+
+
+def encode(payload, media_type: str) -> bytes:
+    if media_type in (MEDIA_COLUMNAR_JSON, MEDIA_COLUMNAR_MSGPACK):
+        payload = to_columnar(payload)
+    if media_type in (MEDIA_MSGPACK, MEDIA_COLUMNAR_MSGPACK):
+        return msgpack.packb(payload, default=_default, use_bin_type=True)
+    return _dump_json(payload)
+
+
+def encoded_response(request: Request, payload, status_code: int = 200) -> Response:
+    """
+    Serialize an already-shaped payload in the format the client asked for.
+    Returning a Response bypasses FastAPI's response_model validation and
+    jsonable_encoder pass, so payload must already match the documented schema.
+    """
+    media_type = negotiate(request)
+    return Response(
+        content=encode(payload, media_type),
+        status_code=status_code,
+        media_type=media_type,
+        headers={"Vary": "Accept"},
+    )
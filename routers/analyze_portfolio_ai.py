@@ -1,9 +1,9 @@
 from openai import OpenAI
-from fastapi import APIRouter, Depends
-import crud, httpx
+from fastapi import APIRouter, HTTPException, Request
+import crud, prefetcher, admission
 import os, asyncio
 from sqlalchemy.orm import Session
-from database import get_db
+from database import SessionLocal
 
 router = APIRouter(
     prefix="/analyze-portfolio/ai",
@@ -27,23 +27,11 @@ async def analyze_saved_portfolio(db: Session, portfolio_id: int) -> dict:
     sector_distribution = {}
     country_exposure = {}
 
-    # Fetch quotes & profiles asynchronously
-    async with httpx.AsyncClient() as client:
-        tasks = [
-            client.get(f"https://finnhub.io/api/v1/quote?symbol={h.ticker}&token={FINNHUB_API_KEY}")
-            for h in holdings
-        ] + [
-            client.get(f"https://finnhub.io/api/v1/stock/profile2?symbol={h.ticker}&token={FINNHUB_API_KEY}")
-            for h in holdings
-        ]
-        responses = await asyncio.gather(*tasks)
-
-    num_holdings = len(holdings)
-    quotes = [r.json() for r in responses[:num_holdings]]
-    profiles = [r.json() for r in responses[num_holdings:]]
-
-    for i, h in enumerate(holdings):
-        quote_data, profile_data = quotes[i], profiles[i]
+    # Quotes & profiles come from the prefetched cache; only misses hit Finnhub
+    quotes, profiles = await prefetcher.load_market_data(db, [h.ticker for h in holdings])
+
+    for h in holdings:
+        quote_data, profile_data = quotes.get(h.ticker, {}), profiles.get(h.ticker, {})
         if "c" not in quote_data or not profile_data:
             continue  # skip invalid tickers
 
@@ -147,15 +135,46 @@ Return the response strictly in JSON with the following structure:
     return completion.choices[0].message
 
 
-@router.post("/{portfolio_id}")
-async def analyze_portfolio_ai(portfolio_id: int, db: Session = Depends(get_db)):
-    portfolio = crud.get_portfolio(db, portfolio_id)
-    holdings = crud.get_portfolio_holdings(db, portfolio_id)
-    
-    portfolio_data = {
-        "cash": portfolio.cash,
-        "holdings": [{"ticker": h.ticker, "quantity": h.quantity} for h in holdings]
-    }
+@router.get("/admission-metrics")
+def admission_metrics():
+    return admission.ai_admission.metrics()
+
 
-    ai_insights = call_ai(portfolio_data)
+# ---------------- Helper: short-lived sessions ----------------
+# No pooled connection is held while a request queues for a slot or waits on the LLM
+def load_portfolio_data(portfolio_id: int) -> dict | None:
+    db = SessionLocal()
+    try:
+        portfolio = crud.get_portfolio(db, portfolio_id)
+        if not portfolio:
+            return None
+        holdings = crud.get_portfolio_holdings(db, portfolio_id)
+        return {
+            "cash": portfolio.cash,
+            "holdings": [{"ticker": h.ticker, "quantity": h.quantity} for h in holdings]
+        }
+    finally:
+        db.close()
+
+
+def save_ai_insights(portfolio_id: int, insights: str):
+    db = SessionLocal()
+    try:
+        crud.save_portfolio_ai_insights(db, portfolio_id, insights)
+    finally:
+        db.close()
+
+
+@router.post("/{portfolio_id}")
+async def analyze_portfolio_ai(portfolio_id: int, request: Request):
+    portfolio_data = await asyncio.to_thread(load_portfolio_data, portfolio_id)
+    if portfolio_data is None:
+        raise HTTPException(status_code=404, detail="Portfolio not found")
+
+    # Bounded, prioritised access to the LLM; sheds with 503 + Retry-After when saturated.
+    # The blocking client call runs in a worker thread so CRUD endpoints stay responsive.
+    async with admission.ai_admission.slot(admission.request_priority(request), admission.request_deadline(request)):
+        ai_insights = await asyncio.to_thread(call_ai, portfolio_data)
+    # Stored so the scenario engine can be seeded from the latest suggested_allocation
+    await asyncio.to_thread(save_ai_insights, portfolio_id, ai_insights.content)
     return {"portfolio_id": portfolio_id, "ai_insights": ai_insights}
@@ -1,6 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
-from database import get_db
+from database import get_db, get_read_db
+from response_encoding import encoded_response, rows_from_orm
 import crud, schemas
 from typing import List
 
@@ -23,8 +24,8 @@ def add_holdings(portfolio_id: int, holdings_list: schemas.HoldingsList, db: Ses
     return results
 
 @router.get("/portfolio/{portfolio_id}", response_model=list[schemas.HoldingResponse])
-def get_portfolio_holdings(portfolio_id: int, db: Session = Depends(get_db)):
+def get_portfolio_holdings(portfolio_id: int, request: Request, db: Session = Depends(get_read_db)):
     holdings = crud.get_portfolio_holdings(db, portfolio_id)
     if not holdings:
         raise HTTPException(status_code=404, detail="No holdings found for this portfolio")
-    return holdings
+    return encoded_response(request, rows_from_orm(holdings, ["id", "portfolio_id", "ticker", "quantity"]))
@@ -1,7 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
-from database import get_db
-import crud, schemas
+from database import get_db, get_read_db
+from response_encoding import Rows, encoded_response, rows_from_orm
+from datetime import datetime
+from typing import Literal, Optional
+import crud, schemas, json
 
 from fastapi import APIRouter
 
@@ -17,12 +20,66 @@ def create_portfolio(user_id: int, portfolio: schemas.PortfolioCreate, db: Sessi
     return crud.create_portfolio(db, portfolio, user_id)
 
 @router.get("/{portfolio_id}", response_model=schemas.PortfolioResponse)
-def read_portfolio(portfolio_id: int, db: Session = Depends(get_db)):
+def read_portfolio(portfolio_id: int, db: Session = Depends(get_read_db)):
     db_portfolio = crud.get_portfolio(db, portfolio_id)
     if not db_portfolio:
         raise HTTPException(status_code=404, detail="Portfolio not found")
     return db_portfolio
 
 @router.get("/user/{user_id}", response_model=list[schemas.PortfolioResponse])
-def list_user_portfolios(user_id: int, db: Session = Depends(get_db)):
-    return crud.get_user_portfolios(db, user_id)
+def list_user_portfolios(user_id: int, request: Request, db: Session = Depends(get_read_db)):
+    portfolios = crud.get_user_portfolios(db, user_id)
+    return encoded_response(request, rows_from_orm(portfolios, ["id", "user_id", "name", "cash", "created_at"]))
+
+@router.get("/{portfolio_id}/analysis", response_model=schemas.SavedPortfolioAnalysis)
+async def read_portfolio_analysis(portfolio_id: int, request: Request, db: Session = Depends(get_db)):
+    analysis = await crud.analyze_saved_portfolio(db, portfolio_id)
+    if analysis is None:
+        raise HTTPException(status_code=404, detail="Portfolio not found")
+    analysis["holdings"] = Rows(analysis["holdings"], list(schemas.SavedHoldingAnalysis.model_fields))
+    return encoded_response(request, analysis)
+
+@router.get("/{portfolio_id}/history", response_model=schemas.PortfolioHistoryResponse)
+def read_portfolio_history(
+    portfolio_id: int,
+    request: Request,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    resolution: Literal["raw", "day", "week", "month"] = "day",
+    limit: int = Query(1000, ge=1, le=10000),
+    db: Session = Depends(get_read_db),
+):
+    if not crud.get_portfolio(db, portfolio_id):
+        raise HTTPException(status_code=404, detail="Portfolio not found")
+
+    rows, truncated = crud.get_valuation_history(db, portfolio_id, resolution, start, end, limit)
+    if resolution == "raw":
+        points = Rows([
+            {
+                "timestamp": r.captured_at,
+                "total_value": r.total_value,
+                "cash": r.cash,
+                "sector_weights": json.loads(r.sector_weights or "{}"),
+            }
+            for r in rows
+        ], ["timestamp", "total_value", "cash", "sector_weights"])
+    else:
+        points = Rows([
+            {
+                "timestamp": r.bucket_start,
+                "total_value": r.close_value,
+                "cash": r.cash,
+                "sector_weights": json.loads(r.sector_weights or "{}"),
+                "open_value": r.open_value,
+                "high_value": r.high_value,
+                "low_value": r.low_value,
+            }
+            for r in rows
+        ], list(schemas.ValuationPoint.model_fields))
+    return encoded_response(request, {
+        "portfolio_id": portfolio_id,
+        "resolution": resolution,
+        "points": points,
+        "truncated": truncated,
+        "next_end": points[0]["timestamp"] if truncated else None,
+    })
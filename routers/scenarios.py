@@ -0,0 +1,83 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy.orm import Session
+from database import get_db
+from response_encoding import Rows, encoded_response
+import crud, schemas, prefetcher, scenario_engine, json
+
+router = APIRouter(
+    prefix="/scenarios",
+    tags=["Scenarios"]
+)
+
+
+def _find_suggested_allocation(data):
+    """Dig suggested_allocation out of the stored AI JSON, wherever the model nested it."""
+    if isinstance(data, dict):
+        if isinstance(data.get("suggested_allocation"), list):
+            return data["suggested_allocation"]
+        for value in data.values():
+            found = _find_suggested_allocation(value)
+            if found is not None:
+                return found
+    return None
+
+
+def ai_insight_allocation(db: Session, portfolio_id: int) -> dict | None:
+    stored = crud.get_latest_portfolio_ai_insights(db, portfolio_id)
+    if not stored or not stored.insights:
+        return None
+    text = stored.insights.strip().removeprefix("```json").removeprefix("```").removesuffix("```")
+    try:
+        rows = _find_suggested_allocation(json.loads(text)) or []
+    except ValueError:
+        return None
+
+    allocation = {}
+    for row in rows:
+        try:
+            target = float(row["target%"])
+        except (KeyError, TypeError, ValueError):
+            continue  # skip malformed rows
+        if target >= 0:
+            allocation[str(row["asset"])] = allocation.get(str(row["asset"]), 0) + target
+    return allocation or None
+
+
+@router.post("/portfolio/{portfolio_id}", response_model=schemas.ScenarioResponse)
+async def evaluate_scenarios(portfolio_id: int, request: schemas.ScenarioRequest, http_request: Request, db: Session = Depends(get_db)):
+    portfolio = crud.get_portfolio(db, portfolio_id)
+    if not portfolio:
+        raise HTTPException(status_code=404, detail="Portfolio not found")
+
+    names = [s.name for s in request.scenarios]
+    allocations = [s.allocation for s in request.scenarios]
+    if request.include_ai_insight:
+        ai_allocation = ai_insight_allocation(db, portfolio_id)
+        if ai_allocation is None:
+            raise HTTPException(status_code=404, detail="No stored AI suggested_allocation for this portfolio")
+        names.append("ai_insight")
+        allocations.append(ai_allocation)
+    if not allocations:
+        raise HTTPException(status_code=400, detail="Provide at least one scenario")
+
+    holdings = crud.get_portfolio_holdings(db, portfolio_id)
+    held = [h.ticker for h in holdings]
+    quotes, profiles = await prefetcher.load_market_data(db, held)
+
+    # Only look up assets that are not already a held ticker, held sector or cash
+    known = {t.upper() for t in held} | {p.get("finnhubIndustry", "Unknown").upper() for p in profiles.values()}
+    known.add(scenario_engine.CASH_ASSET)
+    extra = sorted({a for alloc in allocations for a in alloc if a.upper() not in known})
+    if extra:
+        extra_quotes, extra_profiles = await prefetcher.load_market_data(db, extra)
+        quotes.update(extra_quotes)
+        profiles.update(extra_profiles)
+
+    result = scenario_engine.evaluate_scenarios(portfolio.cash or 0.0, holdings, quotes, profiles, allocations)
+    trade_fields = list(schemas.ScenarioTrade.model_fields)
+    for name, scenario in zip(names, result["scenarios"]):
+        scenario["name"] = name
+        scenario["trades"] = Rows(scenario["trades"], trade_fields)
+    result["current"]["name"] = "current"
+    result["current"]["trades"] = Rows([], trade_fields)
+    return encoded_response(http_request, {"portfolio_id": portfolio_id, **result})
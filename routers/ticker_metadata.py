@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from database import get_db
-import crud, schemas
+from database import get_db, get_read_db
+from typing import Optional
+import crud, schemas, ticker_search
 
 from fastapi import APIRouter
 
@@ -16,8 +17,18 @@ router = APIRouter(
 def upsert_ticker_metadata(ticker: schemas.TickerMetadataCreate, db: Session = Depends(get_db)):
     return crud.upsert_ticker_metadata(db, ticker)
 
+# Served from the in-memory index, no DB round trip; declared before /{ticker} so it isn't shadowed
+@router.get("/search", response_model=list[schemas.TickerSearchResult])
+def search_tickers(
+    q: str = "",
+    sector: Optional[str] = None,
+    country: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=100),
+):
+    return ticker_search.index.search(q, sector=sector, country=country, limit=limit)
+
 @router.get("/{ticker}", response_model=schemas.TickerMetadataResponse)
-def get_ticker_metadata(ticker: str, db: Session = Depends(get_db)):
+def get_ticker_metadata(ticker: str, db: Session = Depends(get_read_db)):
     db_ticker = crud.get_ticker_metadata(db, ticker)
     if not db_ticker:
         raise HTTPException(status_code=404, detail="Ticker metadata not found")
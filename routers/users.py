@@ -1,6 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
-from database import get_db
+from database import get_db, get_read_db
+from response_encoding import encoded_response, rows_from_orm
 import crud, schemas
 
 from fastapi import APIRouter
@@ -19,12 +20,15 @@ def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
     return crud.create_user(db, user)
 
 @router.get("/{user_id}", response_model=schemas.UserResponse)
-def read_user(user_id: int, db: Session = Depends(get_db)):
+def read_user(user_id: int, db: Session = Depends(get_read_db)):
     db_user = crud.get_user(db, user_id)
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
     return db_user
 
 @router.get("/", response_model=list[schemas.UserResponse])
-def list_users(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
-    return crud.get_users(db, skip=skip, limit=limit)
+def list_users(request: Request, skip: int = 0, limit: int = 10, db: Session = Depends(get_read_db)):
+    users = crud.get_users(db, skip=skip, limit=limit)
+    return encoded_response(request, rows_from_orm(
+        users, ["id", "name", "risk_appetite", "investment_horizon", "investment_goal", "created_at"]
+    ))
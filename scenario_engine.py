@@ -0,0 +1,139 @@
+# scenario_engine.py
+import numpy as np
+
+CASH_ASSET = "CASH"
+
+
+def _one_hot(labels: list[str]) -> tuple[list[str], np.ndarray]:
+    names = sorted(set(labels))
+    index = {name: i for i, name in enumerate(names)}
+    matrix = np.zeros((len(labels), len(names)))
+    matrix[np.arange(len(labels)), [index[l] for l in labels]] = 1.0
+    return names, matrix
+
+
+def _concentration(weights: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """HHI and effective number of holdings over invested weights renormalised to sum to 1 (cash excluded)."""
+    invested = weights.sum(axis=1, keepdims=True)
+    normalized = np.divide(weights, invested, out=np.zeros_like(weights), where=invested > 0)
+    hhi = (normalized ** 2).sum(axis=1)
+    effective_holdings = np.divide(1.0, hhi, out=np.zeros_like(hhi), where=hhi > 0)
+    return hhi, effective_holdings
+
+
+def _exposure(weights: np.ndarray, one_hot: np.ndarray, names: list[str]) -> list[dict]:
+    exposure = np.round(weights @ one_hot * 100, 2)
+    return [{name: float(v) for name, v in zip(names, row) if v} for row in exposure]
+
+
+def evaluate_scenarios(cash: float, holdings: list, quotes: dict, profiles: dict, allocations: list[dict]) -> dict:
+    """
+    Evaluate every target allocation against the current holdings in one batch.
+
+    allocations: [{asset: target_percent}], where asset is a ticker, a sector held in
+    the portfolio (spread over its holdings pro rata) or "CASH". Any unallocated
+    remainder stays in cash; allocations over 100% are scaled down.
+
+    Held tickers without a quote can't be valued: they are reported in
+    unpriced_holdings and left out of the portfolio value, weights and trades.
+    """
+    # ---- Universe: held tickers plus any priced ticker a scenario asks for ----
+    quantities = {}
+    for h in holdings:
+        quantities[h.ticker] = quantities.get(h.ticker, 0) + h.quantity
+    requested = {asset for alloc in allocations for asset in alloc}
+
+    unpriced = sorted(t for t in quantities if "c" not in quotes.get(t, {}))
+    tickers = [t for t in dict.fromkeys(list(quantities) + sorted(requested)) if "c" in quotes.get(t, {})]
+    prices = np.array([quotes[t]["c"] for t in tickers], dtype=float)
+    shares = np.array([quantities.get(t, 0.0) for t in tickers], dtype=float)
+    sectors = [profiles.get(t, {}).get("finnhubIndustry", "Unknown") for t in tickers]
+    countries = [profiles.get(t, {}).get("country", "Unknown") for t in tickers]
+
+    current_values = shares * prices
+    total_value = float(cash + current_values.sum())
+
+    sector_names, sector_matrix = _one_hot(sectors)
+    country_names, country_matrix = _one_hot(countries)
+
+    # ---- Map allocation keys (tickers / held sectors) onto ticker columns ----
+    held_value_by_sector = current_values @ sector_matrix
+    sector_share = np.divide(
+        sector_matrix * current_values[:, None], held_value_by_sector,
+        out=np.zeros_like(sector_matrix), where=held_value_by_sector > 0,
+    )
+    sector_keys = [i for i, s in enumerate(sector_names) if s not in quantities and held_value_by_sector[i] > 0]
+    keys = tickers + [sector_names[i] for i in sector_keys]
+    expand = np.vstack([np.eye(len(tickers)), sector_share.T[sector_keys]])
+    key_index = {k: i for i, k in enumerate(keys)}
+    key_index_upper = {k.upper(): i for i, k in enumerate(keys)}
+    unresolved = sorted(a for a in requested if a.upper() != CASH_ASSET and a not in key_index and a.upper() not in key_index_upper)
+
+    targets = np.zeros((len(allocations), len(keys)))
+    for row, alloc in enumerate(allocations):
+        for asset, pct in alloc.items():
+            col = key_index.get(asset, key_index_upper.get(asset.upper()))
+            if col is not None:
+                targets[row, col] += pct / 100.0
+
+    # ---- Vectorized evaluation: S scenarios x N tickers ----
+    weights = targets @ expand
+    gross = weights.sum(axis=1, keepdims=True)
+    weights = np.divide(weights, gross, out=weights, where=gross > 1.0)
+    cash_weights = 1.0 - weights.sum(axis=1)
+
+    if total_value:
+        current_weights = (current_values / total_value)[None, :]
+        current_cash_weight = cash / total_value
+    else:
+        current_weights, current_cash_weight = np.zeros((1, len(tickers))), 0.0
+
+    target_values = weights * total_value
+    trade_values = target_values - current_values
+    trade_shares = np.divide(trade_values, prices, out=np.zeros_like(trade_values), where=prices > 0)
+
+    hhi, effective_holdings = _concentration(weights)
+    max_weight = weights.max(axis=1, initial=0.0)
+    # One-way turnover counts the cash leg too: 0.5 * (sum |dw_i| + |dw_cash|)
+    turnover = 0.5 * (
+        np.abs(weights - current_weights).sum(axis=1) + np.abs(cash_weights - current_cash_weight)
+    ) if total_value else np.zeros(len(allocations))
+
+    sector_exposure = _exposure(weights, sector_matrix, sector_names)
+    country_exposure = _exposure(weights, country_matrix, country_names)
+
+    current_hhi, current_effective = _concentration(current_weights)
+
+    scenarios = []
+    for s in range(len(allocations)):
+        traded = np.flatnonzero(np.abs(trade_values[s]) >= 0.01)
+        scenarios.append({
+            "cash_percent": round(float(cash_weights[s]) * 100, 2),
+            "trades": [
+                {"ticker": tickers[i], "shares": round(float(trade_shares[s, i]), 4), "value": round(float(trade_values[s, i]), 2)}
+                for i in traded
+            ],
+            "sector_exposure": sector_exposure[s],
+            "country_exposure": country_exposure[s],
+            "hhi": round(float(hhi[s]), 4),
+            "max_weight": round(float(max_weight[s]) * 100, 2),
+            "effective_holdings": round(float(effective_holdings[s]), 2),
+            "turnover": round(float(turnover[s]) * 100, 2),
+        })
+
+    return {
+        "portfolio_value": total_value,
+        "current": {
+            "cash_percent": round(current_cash_weight * 100, 2),
+            "trades": [],
+            "sector_exposure": _exposure(current_weights, sector_matrix, sector_names)[0],
+            "country_exposure": _exposure(current_weights, country_matrix, country_names)[0],
+            "hhi": round(float(current_hhi[0]), 4),
+            "max_weight": round(float(current_weights.max(initial=0.0)) * 100, 2),
+            "effective_holdings": round(float(current_effective[0]), 2),
+            "turnover": 0.0,
+        },
+        "scenarios": scenarios,
+        "unresolved_assets": unresolved,
+        "unpriced_holdings": unpriced,
+    }
@@ -1,7 +1,7 @@
 from fastapi import HTTPException
 
 from pydantic import BaseModel, Field, computed_field
-from typing import List, Optional, Dict
+from typing import Annotated, List, Optional, Dict
 from datetime import datetime
 import os, httpx
 
@@ -65,6 +65,83 @@ class HoldingResponse(HoldingBase):
 
 
 
+# ---------- Saved Portfolio Analysis Schemas ----------
+class SavedHoldingAnalysis(BaseModel):
+    ticker: str = Field(..., example="AAPL")
+    quantity: float = Field(..., example=10)
+    price: float = Field(..., example=175.35)
+    sector: str = Field(..., example="Technology")
+    country: str = Field(..., example="US")
+    value: float = Field(..., example=1753.5)
+
+class SavedPortfolioAnalysis(BaseModel):
+    portfolio_value: float
+    cash_value: float
+    holdings: List[SavedHoldingAnalysis]
+    sector_distribution: Dict[str, float] = Field(..., example={"Technology": 40.0})
+    country_exposure: Dict[str, float] = Field(..., example={"US": 70.0})
+
+
+# ---------- Valuation History Schemas ----------
+class ValuationPoint(BaseModel):
+    timestamp: datetime
+    total_value: float
+    cash: float
+    sector_weights: Dict[str, float] = Field(default_factory=dict, example={"Technology": 40.0})
+    open_value: Optional[float] = None
+    high_value: Optional[float] = None
+    low_value: Optional[float] = None
+
+class PortfolioHistoryResponse(BaseModel):
+    portfolio_id: int
+    resolution: str = Field(..., example="day")
+    points: List[ValuationPoint]
+    truncated: bool = Field(False, description="Older points in the range were left out")
+    next_end: Optional[datetime] = Field(
+        None, description="When truncated, pass as end to fetch the preceding page"
+    )
+
+
+# ---------- Scenario Schemas ----------
+class AllocationScenario(BaseModel):
+    name: Optional[str] = Field(None, example="Tilt to energy")
+    allocation: Dict[str, Annotated[float, Field(ge=0)]] = Field(
+        ..., description="Target percent (>= 0) per ticker, held sector or CASH", example={"AAPL": 40.0, "Energy": 20.0, "CASH": 10.0}
+    )
+
+class ScenarioRequest(BaseModel):
+    scenarios: List[AllocationScenario] = Field(default_factory=list)
+    include_ai_insight: bool = Field(
+        False, description="Also evaluate the suggested_allocation from the latest stored AI insight"
+    )
+
+class ScenarioTrade(BaseModel):
+    ticker: str
+    shares: float
+    value: float
+
+class ScenarioResult(BaseModel):
+    name: Optional[str] = None
+    cash_percent: float
+    trades: List[ScenarioTrade]
+    sector_exposure: Dict[str, float]
+    country_exposure: Dict[str, float]
+    hhi: float = Field(..., description="Herfindahl index of invested position weights, renormalised to sum to 1 (0-1)")
+    max_weight: float = Field(..., description="Largest single position, percent of total portfolio value")
+    effective_holdings: float = Field(..., description="1 / HHI")
+    turnover: float = Field(..., description="One-way turnover including the cash leg, percent: 0.5 * (sum |dw| + |dw_cash|)")
+
+class ScenarioResponse(BaseModel):
+    portfolio_id: int
+    portfolio_value: float
+    current: ScenarioResult
+    scenarios: List[ScenarioResult]
+    unresolved_assets: List[str]
+    unpriced_holdings: List[str] = Field(
+        default_factory=list, description="Held tickers with no quote; left out of the value, weights and trades"
+    )
+
+
 # ---------- Ticker Metadata Schemas ----------
 class TickerMetadataBase(BaseModel):
     ticker: str = Field(..., example="AAPL")
@@ -82,6 +159,9 @@ class TickerMetadataResponse(TickerMetadataBase):
     class Config:
         from_attributes = True
 
+class TickerSearchResult(TickerMetadataBase):
+    match: str = Field(..., description="How the ticker matched: exact, prefix, token, fuzzy or facet", example="prefix")
+
 # -------------------------------
 # User Profile
 # -------------------------------
@@ -0,0 +1,156 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from admission import PRIORITY_CLASSES, AdmissionController
+
+HIGH, NORMAL, LOW = PRIORITY_CLASSES["high"], PRIORITY_CLASSES["normal"], PRIORITY_CLASSES["low"]
+
+
+def controller(max_queue=10, service_seconds=1.0):
+    return AdmissionController(max_concurrency=1, max_queue=max_queue, initial_service_seconds=service_seconds)
+
+
+async def hold(ctl, release, order=None, name=None, **slot_args):
+    async with ctl.slot(**slot_args):
+        if order is not None:
+            order.append(name)
+        await release.wait()
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_slot_goes_to_highest_priority_waiter():
+    async def scenario():
+        ctl, release, order = controller(), asyncio.Event(), []
+        holder = asyncio.create_task(hold(ctl, release, order, "holder"))
+        await settle()
+        low = asyncio.create_task(hold(ctl, release, order, "low", priority=LOW))
+        normal = asyncio.create_task(hold(ctl, release, order, "normal", priority=NORMAL))
+        high = asyncio.create_task(hold(ctl, release, order, "high", priority=HIGH))
+        await settle()
+        release.set()
+        await asyncio.gather(holder, low, normal, high)
+        return ctl, order
+
+    ctl, order = asyncio.run(scenario())
+    assert order == ["holder", "high", "normal", "low"]
+    assert ctl.in_flight == 0
+
+
+def test_full_queue_is_rejected_with_retry_after():
+    async def scenario():
+        ctl, release = controller(max_queue=1), asyncio.Event()
+        tasks = [asyncio.create_task(hold(ctl, release)) for _ in range(2)]  # one running, one queued
+        await settle()
+        with pytest.raises(HTTPException) as rejected:
+            async with ctl.slot():
+                pass
+        release.set()
+        await asyncio.gather(*tasks)
+        return ctl, rejected.value
+
+    ctl, error = asyncio.run(scenario())
+    assert error.status_code == 503
+    assert int(error.headers["Retry-After"]) >= 1
+    assert ctl.counters["rejected_queue_full"] == 1
+    assert ctl.counters["admitted"] == ctl.counters["completed"] == 2
+
+
+def test_missed_deadline_is_rejected_up_front():
+    async def scenario():
+        ctl, release = controller(service_seconds=10.0), asyncio.Event()
+        holder = asyncio.create_task(hold(ctl, release))
+        await settle()
+        with pytest.raises(HTTPException) as rejected:
+            async with ctl.slot(deadline=5.0):
+                pass
+        release.set()
+        await holder
+        return ctl, rejected.value
+
+    ctl, error = asyncio.run(scenario())
+    assert error.status_code == 503
+    assert error.headers["Retry-After"] == "10"
+    assert ctl.counters["rejected_deadline"] == 1
+
+
+def test_timeout_while_queued():
+    async def scenario():
+        ctl, release = controller(service_seconds=0.05), asyncio.Event()
+        holder = asyncio.create_task(hold(ctl, release))
+        await settle()
+        with pytest.raises(HTTPException) as rejected:
+            async with ctl.slot(deadline=0.2):
+                pass
+        queued_after_timeout = len(ctl._waiters)
+        release.set()
+        await holder
+        return ctl, rejected.value, queued_after_timeout
+
+    ctl, error, queued_after_timeout = asyncio.run(scenario())
+    assert error.status_code == 503
+    assert "Retry-After" in error.headers
+    assert ctl.counters["timed_out_in_queue"] == 1
+    assert queued_after_timeout == 0
+    assert ctl.in_flight == 0
+
+
+def test_cancelled_waiter_does_not_leak_slot():
+    async def scenario():
+        ctl, release = controller(), asyncio.Event()
+        holder = asyncio.create_task(hold(ctl, release))
+        await settle()
+        waiter = asyncio.create_task(hold(ctl, release))
+        await settle()
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        release.set()
+        await holder
+        return ctl
+
+    ctl = asyncio.run(scenario())
+    assert ctl.in_flight == 0
+    assert ctl._waiters == []
+
+
+def test_waiter_cancelled_after_grant_releases_slot():
+    async def scenario():
+        ctl, release = controller(), asyncio.Event()
+        holder = asyncio.create_task(hold(ctl, release))
+        await settle()
+        waiter = asyncio.create_task(hold(ctl, asyncio.Event()))
+        await settle()
+        release.set()
+        await holder  # hands the slot to the waiter...
+        waiter.cancel()  # ...which is cancelled before it gets to run
+        await asyncio.gather(waiter, return_exceptions=True)
+        return ctl
+
+    ctl = asyncio.run(scenario())
+    assert ctl.in_flight == 0
+
+
+def test_metrics_counters_and_queue_depth():
+    async def scenario():
+        ctl, release = controller(), asyncio.Event()
+        tasks = [asyncio.create_task(hold(ctl, release))]
+        await settle()
+        tasks += [asyncio.create_task(hold(ctl, release, priority=p)) for p in (HIGH, LOW, LOW)]
+        await settle()
+        queued = ctl.metrics()
+        release.set()
+        await asyncio.gather(*tasks)
+        return queued, ctl.metrics()
+
+    queued, done = asyncio.run(scenario())
+    assert queued["in_flight"] == 1
+    assert queued["queue_depth"] == 3
+    assert queued["queue_depth_by_class"] == {"high": 1, "normal": 0, "low": 2}
+    assert done["admitted"] == done["completed"] == 4
+    assert done["queue_depth"] == 0 and done["in_flight"] == 0
+    assert done["wait_seconds"]["max"] >= done["wait_seconds"]["p50"] >= 0
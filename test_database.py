@@ -0,0 +1,99 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+import database as database_module
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """database.py pointed at two local SQLite files, a primary and a replica (restored afterwards)."""
+    engines = {}
+    for label in ("primary", "replica"):
+        engines[label] = database_module.make_engine(f"sqlite:///{tmp_path / f'{label}.db'}")
+        with engines[label].begin() as conn:
+            conn.execute(text("CREATE TABLE source (label TEXT)"))
+            conn.execute(text("INSERT INTO source VALUES (:label)"), {"label": label})
+
+    monkeypatch.setattr(database_module, "engine", engines["primary"])
+    monkeypatch.setattr(database_module, "read_engine", engines["replica"])
+    monkeypatch.setattr(database_module, "SessionLocal", sessionmaker(bind=engines["primary"]))
+    monkeypatch.setattr(database_module, "ReadSessionLocal", sessionmaker(bind=engines["replica"]))
+    monkeypatch.setattr(database_module, "_replica_state", {"usable": False, "lag_seconds": None, "checked_at": 0.0})
+    monkeypatch.setattr(database_module, "DB_REPLICA_MAX_LAG_SECONDS", 5.0)
+    monkeypatch.setattr(database_module, "DB_REPLICA_CHECK_INTERVAL_SECONDS", 0.0)
+    yield database_module
+    for engine in engines.values():
+        engine.dispose()
+
+
+def read_source(database):
+    dependency = database.get_read_db()
+    db = next(dependency)
+    try:
+        return db.execute(text("SELECT label FROM source")).scalar()
+    finally:
+        dependency.close()
+
+
+def test_reads_go_to_replica_when_caught_up(database, monkeypatch):
+    monkeypatch.setattr(database, "replica_lag_seconds", lambda: 0.5)
+    assert read_source(database) == "replica"
+
+
+def test_reads_fall_back_to_primary_when_replica_lags(database, monkeypatch):
+    monkeypatch.setattr(database, "replica_lag_seconds", lambda: 30.0)
+    assert read_source(database) == "primary"
+
+
+def test_reads_fall_back_to_primary_when_replica_not_streaming(database, monkeypatch):
+    monkeypatch.setattr(database, "replica_lag_seconds", lambda: float("inf"))
+    assert read_source(database) == "primary"
+
+
+def test_reads_fall_back_to_primary_when_replica_unreachable(database, monkeypatch):
+    def unreachable():
+        raise ConnectionError("replica down")
+
+    monkeypatch.setattr(database, "replica_lag_seconds", unreachable)
+    assert read_source(database) == "primary"
+
+
+def test_replica_recovers_after_lag_clears(database, monkeypatch):
+    lag = {"seconds": 30.0}
+    monkeypatch.setattr(database, "replica_lag_seconds", lambda: lag["seconds"])
+    assert read_source(database) == "primary"
+    lag["seconds"] = 1.0
+    assert read_source(database) == "replica"
+
+
+def test_sqlite_replica_lag_is_zero(database):
+    assert database.replica_lag_seconds() == 0.0
+
+
+def test_writes_stay_on_primary(database, monkeypatch):
+    monkeypatch.setattr(database, "replica_lag_seconds", lambda: 0.0)
+    dependency = database.get_db()
+    db = next(dependency)
+    try:
+        assert db.execute(text("SELECT label FROM source")).scalar() == "primary"
+    finally:
+        dependency.close()
+
+
+def test_concurrent_check_uses_last_result(database, monkeypatch):
+    database._replica_state.update(usable=True, lag_seconds=0.0)
+    calls = []
+    monkeypatch.setattr(database, "replica_lag_seconds", lambda: calls.append(1) or 30.0)
+    with database._replica_check_lock:  # another request thread is probing
+        assert database.replica_is_usable() is True
+    assert calls == []
+    assert database.replica_is_usable() is False
+
+
+def test_replica_engine_gets_connect_timeout(monkeypatch):
+    monkeypatch.setattr(database_module, "create_engine", lambda url, **options: options)
+    replica = database_module.make_engine("postgresql://replica/db", connect_timeout=3)
+    assert replica["connect_args"]["connect_timeout"] == 3
+    primary = database_module.make_engine("postgresql://primary/db")
+    assert "connect_timeout" not in primary.get("connect_args", {})
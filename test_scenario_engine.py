@@ -0,0 +1,79 @@
+from types import SimpleNamespace
+
+import pytest
+from pydantic import ValidationError
+
+from scenario_engine import evaluate_scenarios
+from schemas import AllocationScenario
+
+# $1000 cash, $1000 AAPL, $1000 XOM -> one third each
+HOLDINGS = [SimpleNamespace(ticker="AAPL", quantity=10), SimpleNamespace(ticker="XOM", quantity=20)]
+QUOTES = {"AAPL": {"c": 100.0}, "XOM": {"c": 50.0}}
+PROFILES = {
+    "AAPL": {"finnhubIndustry": "Technology", "country": "US"},
+    "XOM": {"finnhubIndustry": "Energy", "country": "US"},
+}
+
+
+def run(*allocations):
+    return evaluate_scenarios(1000.0, HOLDINGS, QUOTES, PROFILES, list(allocations))
+
+
+def test_current_concentration_ignores_cash():
+    current = run({})["current"]
+    assert current["cash_percent"] == pytest.approx(33.33)
+    assert current["hhi"] == pytest.approx(0.5)
+    assert current["effective_holdings"] == pytest.approx(2.0)
+
+
+def test_single_position_is_fully_concentrated():
+    scenario = run({"AAPL": 50})["scenarios"][0]
+    assert scenario["hhi"] == pytest.approx(1.0)
+    assert scenario["effective_holdings"] == pytest.approx(1.0)
+    assert scenario["max_weight"] == pytest.approx(50.0)
+    assert scenario["cash_percent"] == pytest.approx(50.0)
+
+
+def test_turnover_counts_cash_leg():
+    single, all_cash = run({"AAPL": 50}, {})["scenarios"]
+    # 0.5 * (|1/2 - 1/3| + |0 - 1/3| + |1/2 - 1/3|)
+    assert single["turnover"] == pytest.approx(33.33)
+    # Selling the whole book into cash: 0.5 * (1/3 + 1/3 + 2/3)
+    assert all_cash["turnover"] == pytest.approx(66.67)
+    assert all_cash["hhi"] == 0.0
+    assert all_cash["effective_holdings"] == 0.0
+
+
+def test_trades_reach_target():
+    trades = {t["ticker"]: t for t in run({"AAPL": 50})["scenarios"][0]["trades"]}
+    assert trades["AAPL"]["shares"] == pytest.approx(5.0)
+    assert trades["AAPL"]["value"] == pytest.approx(500.0)
+    assert trades["XOM"]["shares"] == pytest.approx(-20.0)
+
+
+def test_sector_targets_and_overallocation_are_scaled():
+    result = run({"Technology": 150, "XOM": 50})
+    scenario = result["scenarios"][0]
+    assert scenario["cash_percent"] == pytest.approx(0.0)
+    assert scenario["sector_exposure"] == {"Technology": 75.0, "Energy": 25.0}
+    assert scenario["hhi"] == pytest.approx(0.625)
+    assert result["unresolved_assets"] == []
+
+
+def test_unknown_assets_are_reported():
+    assert run({"FOO": 10, "CASH": 90})["unresolved_assets"] == ["FOO"]
+
+
+def test_unpriced_holdings_are_reported():
+    holdings = HOLDINGS + [SimpleNamespace(ticker="MSFT", quantity=5)]
+    result = evaluate_scenarios(1000.0, holdings, QUOTES, PROFILES, [{"AAPL": 50}])
+    assert result["unpriced_holdings"] == ["MSFT"]
+    assert result["portfolio_value"] == pytest.approx(3000.0)
+    assert "MSFT" not in {t["ticker"] for t in result["scenarios"][0]["trades"]}
+    assert run({})["unpriced_holdings"] == []
+
+
+def test_negative_targets_are_rejected():
+    with pytest.raises(ValidationError):
+        AllocationScenario(allocation={"AAPL": -10, "CASH": 110})
+    assert AllocationScenario(allocation={"AAPL": 0}).allocation == {"AAPL": 0}
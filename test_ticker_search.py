@@ -0,0 +1,74 @@
+from types import SimpleNamespace
+
+import pytest
+
+from ticker_search import TickerSearchIndex
+
+
+def row(ticker, sector, country="US", industry=None):
+    return SimpleNamespace(ticker=ticker, sector=sector, country=country, industry=industry or sector)
+
+
+@pytest.fixture
+def index():
+    index = TickerSearchIndex()
+    index.build([
+        row("AAPL", "Technology", industry="Consumer Electronics"),
+        row("AAL", "Airlines"),
+        row("AMZN", "Retail"),
+        row("XOM", "Energy", industry="Oil & Gas"),
+        row("SHEL.L", "Energy", country="GB", industry="Oil & Gas"),
+    ])
+    return index
+
+
+def matches(results):
+    return [(r["ticker"], r["match"]) for r in results]
+
+
+def test_exact_symbol_comes_first(index):
+    assert matches(index.search("aapl"))[0] == ("AAPL", "exact")
+
+
+def test_symbol_prefix(index):
+    assert matches(index.search("AA")) == [("AAL", "prefix"), ("AAPL", "prefix")]
+
+
+def test_sector_and_industry_words(index):
+    assert matches(index.search("oil")) == [("SHEL.L", "token"), ("XOM", "token")]
+    assert matches(index.search("consumer elec")) == [("AAPL", "token")]
+
+
+def test_one_typo_matches_fuzzily(index):
+    assert ("AAPL", "fuzzy") in matches(index.search("APPL"))
+
+
+def test_facet_only_query(index):
+    assert matches(index.search("", sector="energy")) == [("SHEL.L", "facet"), ("XOM", "facet")]
+    assert matches(index.search("", sector="Energy", country="gb")) == [("SHEL.L", "facet")]
+
+
+def test_facets_filter_text_matches(index):
+    assert matches(index.search("oil", country="US")) == [("XOM", "token")]
+
+
+def test_upsert_adds_new_symbol(index):
+    index.upsert(row("AAPX", "Technology"))
+    assert matches(index.search("AAP"))[:2] == [("AAPL", "prefix"), ("AAPX", "prefix")]
+
+
+def test_upsert_replaces_old_words_and_facets(index):
+    index.upsert(row("XOM", "Utilities", country="CA"))
+    assert matches(index.search("oil")) == [("SHEL.L", "token")]
+    assert matches(index.search("utilities")) == [("XOM", "token")]
+    assert matches(index.search("", country="US")) == [("AAL", "facet"), ("AAPL", "facet"), ("AMZN", "facet")]
+    assert matches(index.search("", country="CA")) == [("XOM", "facet")]
+
+
+def test_upsert_prunes_words_nobody_uses(index):
+    index.upsert(row("AMZN", "Consumer Cyclical"))
+    assert "retail" not in index._words
+    assert "retail" not in index._word_keys
+    assert index._word_keys == sorted(index._words)
+    assert index.search("retail") == []
+    assert all(index._words.values()) and all(index._fuzzy.values())
@@ -0,0 +1,182 @@
+# ticker_search.py
+from bisect import bisect_left, insort
+from database import SessionLocal
+import crud, asyncio, os, re, threading
+
+TICKER_INDEX_REFRESH_SECONDS = int(os.getenv("TICKER_INDEX_REFRESH_SECONDS", "300"))
+
+FACETS = ("sector", "country")
+
+
+def _words(text: str | None) -> list[str]:
+    return re.findall(r"[a-z0-9]+", (text or "").lower())
+
+
+def _deletes(symbol: str) -> set[str]:
+    """Symbol plus every single-character deletion: two symbols within one edit share a key."""
+    return {symbol} | {symbol[:i] + symbol[i + 1:] for i in range(len(symbol))}
+
+
+def _drop(postings: dict, key: str, symbol: str):
+    """Remove symbol from postings[key], deleting the key once nothing is left under it."""
+    symbols = postings.get(key)
+    if symbols is not None:
+        symbols.discard(symbol)
+        if not symbols:
+            del postings[key]
+
+
+def _prefix_range(sorted_keys: list[str], prefix: str):
+    start = bisect_left(sorted_keys, prefix)
+    for key in sorted_keys[start:]:
+        if not key.startswith(prefix):
+            break
+        yield key
+
+
+class TickerSearchIndex:
+    """
+    In-memory autocomplete over TickerMetadata: symbol prefix, one-edit fuzzy symbol
+    matching, prefix search on sector/industry words, and sector/country facets.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}   # SYMBOL -> {"ticker", "sector", "country", "industry"}
+        self._symbols = []   # sorted SYMBOLs
+        self._words = {}     # word -> {SYMBOL}
+        self._word_keys = [] # sorted words
+        self._fuzzy = {}     # deletion key -> {SYMBOL}
+        self._facets = {facet: {} for facet in FACETS}  # facet -> value -> {SYMBOL}
+
+    # ---------------- Updates ----------------
+    def _add(self, entry: dict):
+        symbol = entry["ticker"].upper()
+        self._entries[symbol] = entry
+        for word in _words(entry["sector"]) + _words(entry["industry"]):
+            self._words.setdefault(word, set()).add(symbol)
+        for key in _deletes(symbol):
+            self._fuzzy.setdefault(key, set()).add(symbol)
+        for facet in FACETS:
+            if entry[facet]:
+                self._facets[facet].setdefault(entry[facet].lower(), set()).add(symbol)
+
+    def _discard(self, symbol: str):
+        entry = self._entries.pop(symbol, None)
+        if not entry:
+            return
+        for word in _words(entry["sector"]) + _words(entry["industry"]):
+            _drop(self._words, word, symbol)
+        for key in _deletes(symbol):
+            _drop(self._fuzzy, key, symbol)
+        for facet in FACETS:
+            if entry[facet]:
+                _drop(self._facets[facet], entry[facet].lower(), symbol)
+
+    @staticmethod
+    def _entry(row) -> dict:
+        return {"ticker": row.ticker, "sector": row.sector, "country": row.country, "industry": row.industry}
+
+    def build(self, rows):
+        fresh = TickerSearchIndex()
+        for row in rows:
+            fresh._add(self._entry(row))
+        fresh._symbols = sorted(fresh._entries)
+        fresh._word_keys = sorted(fresh._words)
+        with self._lock:
+            self._entries, self._symbols = fresh._entries, fresh._symbols
+            self._words, self._word_keys = fresh._words, fresh._word_keys
+            self._fuzzy, self._facets = fresh._fuzzy, fresh._facets
+
+    def upsert(self, row):
+        entry = self._entry(row)
+        symbol = entry["ticker"].upper()
+        with self._lock:
+            old = self._entries.get(symbol)
+            is_new = old is None
+            new_words = {w for w in _words(entry["sector"]) + _words(entry["industry"]) if w not in self._words}
+            self._discard(symbol)
+            self._add(entry)
+            old_words = set(_words(old["sector"]) + _words(old["industry"])) if old else set()
+            gone_words = {w for w in old_words if w not in self._words}
+            # Copy-on-write so concurrent searches keep iterating a consistent list
+            if is_new:
+                symbols = list(self._symbols)
+                insort(symbols, symbol)
+                self._symbols = symbols
+            if new_words or gone_words:
+                word_keys = list(self._word_keys)
+                for word in gone_words:
+                    del word_keys[bisect_left(word_keys, word)]
+                for word in new_words:
+                    insort(word_keys, word)
+                self._word_keys = word_keys
+
+    # ---------------- Search ----------------
+    def search(self, q: str = "", sector: str | None = None, country: str | None = None, limit: int = 10) -> list[dict]:
+        allowed = None
+        for facet, value in (("sector", sector), ("country", country)):
+            if value:
+                matches = self._facets[facet].get(value.lower(), set())
+                allowed = matches if allowed is None else allowed & matches
+
+        def ok(symbol):
+            return allowed is None or symbol in allowed
+
+        results, seen = [], set()
+
+        def collect(symbols, match):
+            for symbol in symbols:
+                if len(results) >= limit:
+                    return
+                if symbol in seen or not ok(symbol) or symbol not in self._entries:
+                    continue
+                seen.add(symbol)
+                results.append({**self._entries[symbol], "match": match})
+
+        query = q.strip()
+        if not query:
+            collect(sorted(allowed) if allowed is not None else self._symbols, "facet")
+            return results
+
+        symbol_query = query.upper()
+        collect([symbol_query], "exact")
+        collect(_prefix_range(self._symbols, symbol_query), "prefix")
+
+        # Every query word must prefix-match some sector/industry word
+        word_hits = None
+        for word in _words(query):
+            hits = set()
+            for key in _prefix_range(self._word_keys, word):
+                hits |= self._words.get(key, set())
+            word_hits = hits if word_hits is None else word_hits & hits
+        if word_hits:
+            collect(sorted(word_hits), "token")
+
+        if len(results) < limit and " " not in query:
+            fuzzy = set()
+            for key in _deletes(symbol_query):
+                fuzzy |= self._fuzzy.get(key, set())
+            collect(sorted(fuzzy), "fuzzy")
+        return results
+
+
+index = TickerSearchIndex()
+
+
+def rebuild_index():
+    db = SessionLocal()
+    try:
+        index.build(crud.get_all_ticker_metadata(db))
+    finally:
+        db.close()
+
+
+async def run_index_refresh():
+    """Periodic full rebuild so upserts made by other worker processes show up too."""
+    while True:
+        await asyncio.sleep(TICKER_INDEX_REFRESH_SECONDS)
+        try:
+            await asyncio.to_thread(rebuild_index)
+        except Exception as e:
+            print("⚠️ ticker index refresh failed:", e)
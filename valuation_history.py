@@ -0,0 +1,130 @@
+# valuation_history.py
+from datetime import datetime, timedelta, timezone
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from models import PortfolioValuation, PortfolioValuationRollup
+import crud, prefetcher, asyncio, json, os
+
+SNAPSHOT_INTERVAL_SECONDS = int(os.getenv("VALUATION_SNAPSHOT_INTERVAL_SECONDS", "900"))
+
+ROLLUP_RESOLUTIONS = ("day", "week", "month")
+
+
+# ---------------- Buckets ----------------
+def bucket_start(ts: datetime, resolution: str) -> datetime:
+    """Start of the UTC day / ISO week (Monday) / month that ts falls in."""
+    day = ts.astimezone(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    if resolution == "day":
+        return day
+    if resolution == "week":
+        return day - timedelta(days=day.weekday())
+    if resolution == "month":
+        return day.replace(day=1)
+    raise ValueError(f"Unknown resolution: {resolution}")
+
+
+# ---------------- Valuation ----------------
+def compute_valuation(cash: float, holdings: list, quotes: dict, profiles: dict) -> dict | None:
+    """Valuation from last known prices, or None if any holding has never been priced."""
+    if any("c" not in quotes.get(h.ticker, {}) for h in holdings):
+        return None  # a partial value would be stored for good and drag the rollup lows down
+
+    total_value = cash
+    sector_values = {}
+    for h in holdings:
+        value = h.quantity * quotes[h.ticker]["c"]
+        sector = profiles.get(h.ticker, {}).get("finnhubIndustry", "Unknown")
+        sector_values[sector] = sector_values.get(sector, 0) + value
+        total_value += value
+
+    sector_weights = {k: round((v / total_value) * 100, 2) for k, v in sector_values.items()} if total_value else {}
+    return {"total_value": total_value, "cash": cash, "sector_weights": sector_weights}
+
+
+def _update_rollup(db: Session, snapshot: PortfolioValuation, resolution: str):
+    start = bucket_start(snapshot.captured_at, resolution)
+    rollup = (
+        db.query(PortfolioValuationRollup)
+        .filter(
+            PortfolioValuationRollup.portfolio_id == snapshot.portfolio_id,
+            PortfolioValuationRollup.resolution == resolution,
+            PortfolioValuationRollup.bucket_start == start,
+        )
+        .first()
+    )
+    if rollup:
+        rollup.high_value = max(rollup.high_value, snapshot.total_value)
+        rollup.low_value = min(rollup.low_value, snapshot.total_value)
+        rollup.close_value = snapshot.total_value
+        rollup.cash = snapshot.cash
+        rollup.sector_weights = snapshot.sector_weights
+        rollup.samples += 1
+    else:
+        db.add(PortfolioValuationRollup(
+            portfolio_id=snapshot.portfolio_id,
+            resolution=resolution,
+            bucket_start=start,
+            open_value=snapshot.total_value,
+            high_value=snapshot.total_value,
+            low_value=snapshot.total_value,
+            close_value=snapshot.total_value,
+            cash=snapshot.cash,
+            sector_weights=snapshot.sector_weights,
+            samples=1,
+        ))
+
+
+def record_valuation(db: Session, portfolio_id: int, valuation: dict, captured_at: datetime | None = None):
+    """Append one snapshot and fold it into the day/week/month rollups (caller commits)."""
+    snapshot = PortfolioValuation(
+        portfolio_id=portfolio_id,
+        captured_at=captured_at or datetime.now(timezone.utc),
+        total_value=valuation["total_value"],
+        cash=valuation["cash"],
+        sector_weights=json.dumps(valuation["sector_weights"]),
+    )
+    db.add(snapshot)
+    for resolution in ROLLUP_RESOLUTIONS:
+        _update_rollup(db, snapshot, resolution)
+    return snapshot
+
+
+# ---------------- Scheduler ----------------
+def snapshot_all_portfolios():
+    db = SessionLocal()
+    try:
+        portfolios = crud.get_all_portfolios(db)
+        holdings_by_portfolio = {}
+        for h in crud.get_all_holdings(db):
+            holdings_by_portfolio.setdefault(h.portfolio_id, []).append(h)
+
+        # Prices come only from what the prefetcher stored; snapshots never call Finnhub
+        tickers = list({h.ticker for hs in holdings_by_portfolio.values() for h in hs})
+        quotes, profiles = prefetcher.cached_market_data(db, tickers)
+
+        captured_at = datetime.now(timezone.utc)
+        skipped = 0
+        for portfolio in portfolios:
+            valuation = compute_valuation(
+                portfolio.cash or 0.0, holdings_by_portfolio.get(portfolio.id, []), quotes, profiles
+            )
+            if valuation is None:
+                skipped += 1
+                continue
+            record_valuation(db, portfolio.id, valuation, captured_at)
+        db.commit()
+        if skipped:
+            print(f"⚠️ valuation snapshot skipped {skipped} portfolio(s) with unpriced holdings")
+    finally:
+        db.close()
+
+
+async def run_valuation_snapshots():
+    """Background loop; run by the background-job leader after the prefetcher's first cycle."""
+    await prefetcher.first_cycle_done.wait()
+    while True:
+        try:
+            await asyncio.to_thread(snapshot_all_portfolios)
+        except Exception as e:
+            print("⚠️ valuation snapshot failed:", e)
+        await asyncio.sleep(SNAPSHOT_INTERVAL_SECONDS)